@@ -1,10 +1,8 @@
 import numpy as np
 import os
-import queue
 import sounddevice as sd
 import sys
 import threading
-import yaml
 import traceback
 
 from concurrent.futures import ThreadPoolExecutor
@@ -16,9 +14,15 @@ if current_dir not in sys.path:
 
 # Handle imports for both direct Python execution and PyInstaller
 try:
-    from standalone_model import StandaloneWhisperModel
+    from standalone_model import StandaloneWhisperModel, get_model
+    from audio_buffer import ChunkDispatcher, SpscRing
+    import _kernels
+    from _config import load_config
 except ImportError:
-    from .standalone_model import StandaloneWhisperModel
+    from .standalone_model import StandaloneWhisperModel, get_model
+    from .audio_buffer import ChunkDispatcher, SpscRing
+    from . import _kernels
+    from ._config import load_config
 
 
 def flush_output():
@@ -29,18 +33,17 @@ def flush_output():
 
 def process_transcription(
     whisper_model: StandaloneWhisperModel,
-    chunk: np.ndarray,
-    silence_threshold: float,
+    chunks: list,
     sample_rate: int
 ) -> None:
     """
-    Process a chunk of audio data and transcribe it using the Whisper model.
+    Process a batch of audio chunks and transcribe them using the Whisper model.
     This function is run in a separate thread to allow for concurrent processing.
+    Silent chunks are already filtered out by process_audio.
     """
     
     try:
-        if np.abs(chunk).mean() > silence_threshold:
-            transcript = whisper_model.transcribe(chunk, sample_rate)
+        for transcript in whisper_model.transcribe_batch(chunks, sample_rate):
             if transcript.strip():
                 print(f"Transcript: {transcript}")
                 flush_output()
@@ -52,83 +55,109 @@ def process_transcription(
 
 def process_audio(
     whisper_model: StandaloneWhisperModel,
-    audio_queue: queue.Queue,
+    audio_ring: SpscRing,
     stop_event: threading.Event,
     max_workers: int,
+    max_batch: int,
     queue_timeout: float,
     chunk_samples: int,
     silence_threshold: float,
     sample_rate: int
 ) -> None:
     """
-    Process audio data from the queue and transcribe it using the Whisper model.
+    Process audio data from the capture ring and transcribe it using the Whisper model.
+    Captured int16 blocks are converted to float32 and handed to a ChunkDispatcher.
     """
 
-    buffer = np.empty((0,), dtype=np.float32)
-    
+    samples = np.empty(audio_ring.frame_shape, dtype=np.float32)
+
+    def to_float(frame):
+        _kernels.i16_to_f32(frame, samples)
+        return samples
+
+    def on_error(e):
+        print(f"[ERROR] Error in audio processing: {e}")
+        traceback.print_exc()
+        flush_output()
+
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = []
-        
-        while not stop_event.is_set():
-            try:
-                audio_chunk = audio_queue.get(timeout=queue_timeout)
-                audio_chunk = audio_chunk.flatten()
-                buffer = np.concatenate([buffer, audio_chunk])
-
-                while len(buffer) >= chunk_samples:
-                    current_chunk = buffer[:chunk_samples]
-                    buffer = buffer[chunk_samples:]
-                    
-                    future = executor.submit(
-                        process_transcription,
-                        whisper_model,
-                        current_chunk,
-                        silence_threshold,
-                        sample_rate
-                    )
-                    futures = [f for f in futures if not f.done()] + [future]
-
-            except queue.Empty:
-                continue
-            except Exception as e:
-                print(f"[ERROR] Error in audio processing: {e}")
-                traceback.print_exc()
-                flush_output()
-            
-        # Wait for transcription futures to complete
-        for future in futures:
-            try:
-                future.result()
-            except Exception as e:
-                print(f"[ERROR] Error in future result: {e}")
-                flush_output()
+        dispatcher = ChunkDispatcher(
+            executor,
+            lambda chunks: process_transcription(whisper_model, chunks, sample_rate),
+            lambda chunk: _kernels.mean_abs(chunk) > silence_threshold,
+            chunk_samples,
+            max_workers,
+            max_batch,
+        )
+        dispatcher.run(audio_ring, stop_event, queue_timeout, on_error, convert=to_float)
+        # leaving the executor waits for in-flight transcriptions to finish
+
+    if dispatcher.pool.misses:
+        print(f"[WARN] Allocated {dispatcher.pool.misses} chunk buffers outside the pool (pool exhausted)")
+        flush_output()
+
+
+def raise_thread_priority() -> None:
+    """
+    Best-effort bump of the calling thread to real-time/time-critical priority
+    so Whisper decode bursts don't preempt audio capture.
+    """
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            THREAD_PRIORITY_TIME_CRITICAL = 15
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetThreadPriority(kernel32.GetCurrentThread(), THREAD_PRIORITY_TIME_CRITICAL)
+        elif hasattr(os, "sched_setscheduler"):
+            # pid 0 targets the calling thread on Linux; needs CAP_SYS_NICE
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(20))
+    except (OSError, AttributeError):
+        pass
 
 
 def record_audio(
-    audio_queue: queue.Queue,
+    audio_ring: SpscRing,
     stop_event: threading.Event,
     sample_rate: int,
-    channels: int
+    channels: int,
+    blocksize: int
 ) -> None:
     """
-    Record audio from the microphone and put it into the audio queue.
+    Record audio from the microphone and push it into the capture ring.
+    Audio is captured as raw int16 PCM and copied into the ring's
+    preallocated slots so the callback never allocates or blocks.
     """
 
+    priority_raised = False
+
     def audio_callback(indata, frames, time, status):
         """Callback function for audio input stream."""
+        nonlocal priority_raised
+        if not priority_raised:
+            # the callback runs on PortAudio's thread, not this one
+            raise_thread_priority()
+            priority_raised = True
         if not stop_event.is_set():
-            audio_queue.put(indata.copy())
+            # a full ring means processing has fallen behind; the block is dropped
+            audio_ring.try_push(np.frombuffer(indata, dtype=np.int16))
 
     try:        
-        with sd.InputStream(
+        with sd.RawInputStream(
             samplerate=sample_rate,
             channels=channels,
+            dtype="int16",
+            blocksize=blocksize,
+            latency="low",
             callback=audio_callback
         ):
             print("[AUDIO] Microphone stream initialized... (Press Ctrl+C to stop)")
             print("=" * 50)
             flush_output()
             stop_event.wait()
+
+        if audio_ring.dropped:
+            print(f"[WARN] Dropped {audio_ring.dropped} audio blocks (capture ring full)")
+            flush_output()
     except Exception as e:
         print(f"[ERROR] Error in audio recording: {e}")
         traceback.print_exc()
@@ -141,8 +170,7 @@ class StandaloneLiveTranscriber:
         flush_output()
         
         try:
-            with open("config.yaml", "r") as f:
-                config = yaml.safe_load(f)
+            config = load_config("config.yaml")
             
             print("[CONFIG] Configuration loaded successfully")
             flush_output()
@@ -151,9 +179,11 @@ class StandaloneLiveTranscriber:
             self.sample_rate = config.get("sample_rate", 16000)
             self.chunk_duration = config.get("chunk_duration", 4)
             self.channels = config.get("channels", 1)
+            self.blocksize = config.get("blocksize", 256)
             
             # processing settings
             self.max_workers = config.get("max_workers", 4)
+            self.max_batch = config.get("max_batch", 4)
             self.silence_threshold = config.get("silence_threshold", 0.001)
             self.queue_timeout = config.get("queue_timeout", 1.0)
             self.chunk_samples = int(self.sample_rate * self.chunk_duration)
@@ -180,13 +210,29 @@ class StandaloneLiveTranscriber:
             print("🤖 Loading Standalone Whisper model...")
             flush_output()
             
-            self.model = StandaloneWhisperModel(self.encoder_path, self.decoder_path)
+            self.model = get_model(self.encoder_path, self.decoder_path)
             
             print("[MODEL] Model loaded successfully!")
             flush_output()
 
-            # initialize the audio queue and stop event
-            self.audio_queue = queue.Queue()
+            # compile the silence gate kernel and run one silent chunk through
+            # the model so ONNX Runtime's first-call setup happens before recording;
+            # the app is used directly because transcribe() swallows errors
+            _kernels.warmup()
+            try:
+                self.model.make_app().transcribe(
+                    np.zeros((self.chunk_samples,), dtype=np.float32), self.sample_rate
+                )
+                print("[MODEL] Warm-up complete")
+            except Exception as e:
+                print(f"[WARN] Model warm-up failed: {e}")
+            flush_output()
+
+            # initialize the capture ring and stop event
+            n_slots = max(8, 2 * self.chunk_samples // self.blocksize)
+            self.audio_ring = SpscRing(
+                n_slots, (self.blocksize * self.channels,), dtype=np.int16
+            )
             self.stop_event = threading.Event()
             
         except Exception as e:
@@ -204,9 +250,10 @@ class StandaloneLiveTranscriber:
                 target=process_audio, 
                 args=(
                     self.model,
-                    self.audio_queue,
+                    self.audio_ring,
                     self.stop_event,
                     self.max_workers,
+                    self.max_batch,
                     self.queue_timeout,
                     self.chunk_samples,
                     self.silence_threshold,
@@ -218,10 +265,11 @@ class StandaloneLiveTranscriber:
             record_thread = threading.Thread(
                 target=record_audio, 
                 args=(
-                    self.audio_queue,
+                    self.audio_ring,
                     self.stop_event,
                     self.sample_rate,
-                    self.channels
+                    self.channels,
+                    self.blocksize
                 )
             )
             record_thread.start()
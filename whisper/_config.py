@@ -0,0 +1,27 @@
+# ---------------------------------------------------------------------
+# Cached YAML config loading shared by the whisper and AnythingLLM scripts
+# ---------------------------------------------------------------------
+import functools
+import os
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:
+    from yaml import SafeLoader as _Loader
+
+
+@functools.lru_cache(maxsize=8)
+def _load(path: str, mtime_ns: int) -> dict:
+    with open(path, "r") as f:
+        return yaml.load(f, Loader=_Loader) or {}
+
+
+def load_config(path) -> dict:
+    """
+    Load a YAML config file, parsing it at most once per modification.
+    Uses the libyaml loader when PyYAML was built with it.
+    """
+    path = os.path.abspath(os.fspath(path))
+    return dict(_load(path, os.stat(path).st_mtime_ns))
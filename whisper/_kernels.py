@@ -0,0 +1,51 @@
+# ---------------------------------------------------------------------
+# Numba kernels for the per-chunk audio hot path
+# ---------------------------------------------------------------------
+import threading
+
+import numpy as np
+
+try:
+    import numba
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+
+if HAS_NUMBA:
+    @njit(numba.float64(numba.float32[::1]), cache=True, fastmath=True, nogil=True)
+    def mean_abs(x):
+        """Mean absolute amplitude of a chunk in a single fused pass"""
+        s = 0.0
+        for i in range(x.shape[0]):
+            s += abs(x[i])
+        return s / x.shape[0]
+
+    @njit(numba.void(numba.int16[::1], numba.float32[::1]), cache=True, fastmath=True, nogil=True)
+    def i16_to_f32(src, dst):
+        """Convert int16 PCM to float32 in [-1, 1) into a preallocated buffer"""
+        scale = np.float32(1.0 / 32768.0)
+        for i in range(src.shape[0]):
+            dst[i] = src[i] * scale
+else:
+    _scratch = threading.local()
+
+    def mean_abs(x):
+        """Mean absolute amplitude of a chunk (NumPy fallback, per-thread scratch)"""
+        buf = getattr(_scratch, "buf", None)
+        if buf is None or buf.shape != x.shape:
+            buf = np.empty_like(x)
+            _scratch.buf = buf
+        np.abs(x, out=buf)
+        return float(np.add.reduce(buf)) / x.shape[0]
+
+    def i16_to_f32(src, dst):
+        """Convert int16 PCM to float32 in [-1, 1) (NumPy fallback)"""
+        np.multiply(src, np.float32(1.0 / 32768.0), out=dst)
+
+
+def warmup():
+    """Trigger kernel compilation/cache load before live audio arrives"""
+    mean_abs(np.zeros((1,), dtype=np.float32))
+    i16_to_f32(np.zeros((1,), dtype=np.int16), np.zeros((1,), dtype=np.float32))
@@ -0,0 +1,34 @@
+# ---------------------------------------------------------------------
+# Newline-delimited JSON output for the Node.js-facing scripts
+# ---------------------------------------------------------------------
+import json
+import sys
+
+# orjson is optional; the stdlib fallback is set up to match its compact,
+# raw UTF-8 output so both paths emit the same lines. orjson's
+# JSONDecodeError subclasses json.JSONDecodeError, so callers catch that.
+try:
+    import orjson
+
+    def json_loads(data):
+        return orjson.loads(data)
+
+    def json_dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+except ImportError:
+    def json_loads(data):
+        return json.loads(data)
+
+    def json_dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def emit_json(obj) -> None:
+    """
+    Write one JSON event as a single line straight to the stdout buffer.
+    Any pending print() output is flushed first so lines stay in order.
+    """
+    line = json_dumps(obj) + b"\n"
+    sys.stdout.flush()
+    sys.stdout.buffer.write(line)
+    sys.stdout.buffer.flush()
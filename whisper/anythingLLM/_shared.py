@@ -0,0 +1,20 @@
+# ---------------------------------------------------------------------
+# Helpers shared by the AnythingLLM scripts
+# ---------------------------------------------------------------------
+import os
+import sys
+
+import requests
+
+# Cached config loading lives in the parent whisper directory
+parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from _config import load_config
+from _output import emit_json, json_dumps, json_loads
+
+# One module-level session so repeated helper calls reuse the pooled keep-alive connection
+SESSION = requests.Session()
+
+__all__ = ["SESSION", "emit_json", "json_dumps", "json_loads", "load_config"]
@@ -1,7 +1,7 @@
-import requests
-import yaml
 from pathlib import Path
 
+from _shared import SESSION, load_config
+
 def auth(api_key: str, base_url: str) -> dict:
     """
     Confirms the auth token is valid
@@ -17,7 +17,7 @@ def auth(api_key: str, base_url: str) -> dict:
     }
 
     try:
-        auth_response = requests.get(auth_url, headers=headers)
+        auth_response = SESSION.get(auth_url, headers=headers)
 
         if auth_response.status_code == 200:
             return {
@@ -44,8 +44,7 @@ def test_auth(config_path=None):
         config_path = Path(__file__).parent / "config.yaml"
 
     try:
-        with open(config_path, "r") as file:
-            config = yaml.safe_load(file)
+        config = load_config(config_path)
 
         api_key = config["api_key"]
         base_url = config["model_server_base_url"]
@@ -1,18 +1,26 @@
+import importlib.util
+import os
 import requests
-import yaml
+from requests.adapters import HTTPAdapter
 import json
 import sys
+import threading
+import time
 import asyncio
 import httpx
 from pathlib import Path
 
+from _shared import emit_json, json_dumps, json_loads, load_config
+
+# HTTP/2 needs the optional h2 package; without it httpx stays on HTTP/1.1
+HAS_H2 = importlib.util.find_spec("h2") is not None
+
 class ChatbotClient:
     def __init__(self, config_path=None):
         if config_path is None:
             config_path = Path(__file__).parent / "config.yaml"
 
-        with open(config_path, "r") as file:
-            config = yaml.safe_load(file)
+        config = load_config(config_path)
 
         self.api_key = config["api_key"]
         self.base_url = config["model_server_base_url"]
@@ -30,54 +38,98 @@ class ChatbotClient:
             "Authorization": "Bearer " + self.api_key
         }
 
+        # Pooled session so chat turns reuse the keep-alive connection
+        self._session = requests.Session()
+        self._session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+        # Persistent client so streaming turns reuse the keep-alive connection
+        # (multiplexed over one connection when HTTP/2 is available)
+        self._http_limits = httpx.Limits(max_keepalive_connections=4)
+        self.stream_client = httpx.Client(
+            http2=HAS_H2, timeout=self.stream_timeout, limits=self._http_limits
+        )
+        self._async_client = None  # created lazily on the caller's event loop
+        self._async_loop = None
+
         # Live transcript file path for immediate context
         self.live_transcript_file = None
         self.max_context_chars = 8000  # Limit context to prevent token overflow
+        self._cached_header = None  # (path, header bytes)
+        self._context_cache = None  # ((path, mtime_ns, size), context)
+
+    def close(self):
+        """Close pooled HTTP connections"""
+        self._session.close()
+        self.stream_client.close()
+        self._detach_async_client()
+
+    async def aclose(self):
+        """Close the AsyncClient used by astreaming_chat, from the loop that used it"""
+        client = self._async_client
+        self._async_client = None
+        self._async_loop = None
+        if client is not None:
+            await client.aclose()
 
     def set_live_transcript_file(self, file_path: str):
         """Set the live transcript file path for immediate context"""
         self.live_transcript_file = file_path
 
     def _get_live_context(self) -> str:
-        """Read live transcript file for immediate context"""
+        """
+        Read live transcript file for immediate context.
+        Only the header and the tail of the file are read, and the result is
+        reused while the file's mtime and size are unchanged.
+        """
         if not self.live_transcript_file:
             return ""
 
         try:
-            with open(self.live_transcript_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-
-            # Limit context size to prevent token overflow
-            if len(content) > self.max_context_chars:
-                lines = content.split('\n')
-                # Keep the header and recent lines
-                header_lines = []
-                content_lines = []
-                in_header = True
-
-                for line in lines:
-                    if in_header and (line.startswith('=') or not line.strip()):
-                        header_lines.append(line)
-                        if line.startswith('='):
-                            in_header = False
-                    else:
-                        content_lines.append(line)
-
-                # Take recent transcript lines that fit within limit
-                header_text = '\n'.join(header_lines)
-                remaining_chars = self.max_context_chars - len(header_text)
-
-                recent_lines = []
-                char_count = 0
-                for line in reversed(content_lines):
-                    if char_count + len(line) + 1 <= remaining_chars:
-                        recent_lines.insert(0, line)
-                        char_count += len(line) + 1
-                    else:
-                        break
-
-                content = header_text + '\n' + '\n'.join(recent_lines)
-
+            stat = os.stat(self.live_transcript_file)
+            cache_key = (self.live_transcript_file, stat.st_mtime_ns, stat.st_size)
+            if self._context_cache is not None and self._context_cache[0] == cache_key:
+                return self._context_cache[1]
+
+            with open(self.live_transcript_file, 'rb') as f:
+                size = stat.st_size
+
+                # Small files are returned whole
+                if size <= self.max_context_chars:
+                    content = f.read().decode('utf-8', errors='ignore')
+                    if len(content) <= self.max_context_chars:
+                        self._context_cache = (cache_key, content)
+                        return content
+
+                # Header (session line, start time, '=' separator) is read once per file
+                if self._cached_header is None or self._cached_header[0] != self.live_transcript_file:
+                    f.seek(0)
+                    head = f.read(4096)
+                    # The header ends with the first line that starts with '='
+                    sep = 0 if head.startswith(b'=') else head.find(b'\n=') + 1
+                    hdr_end = head.find(b'\n', sep) + 1 if (sep or head[:1] == b'=') else 0
+                    self._cached_header = (self.live_transcript_file, head[:hdr_end])
+                header_bytes = self._cached_header[1]
+                header_text = header_bytes.decode('utf-8', errors='ignore').rstrip('\n')
+
+                # Seek close to the end instead of loading the whole transcript
+                tail_start = max(len(header_bytes), size - 2 * self.max_context_chars)
+                f.seek(tail_start)
+                tail = f.read().decode('utf-8', errors='ignore')
+
+            if tail_start > len(header_bytes):
+                tail = tail[tail.find('\n') + 1:]  # drop the partial first line
+
+            # Keep the most recent whole lines that fit within the limit
+            remaining_chars = self.max_context_chars - len(header_text) - 1
+            if len(tail) > remaining_chars:
+                tail = tail[len(tail) - remaining_chars:]
+                tail = tail[tail.find('\n') + 1:]
+
+            content = header_text + '\n' + tail
+            self._context_cache = (cache_key, content)
             return content
         except Exception as e:
             print(f"Error reading live transcript: {e}")
@@ -108,10 +160,9 @@ class ChatbotClient:
             "reset": False
         }
         try:
-            chat_response = requests.post(
+            chat_response = self._session.post(
                 self.chat_url,
-                headers=self.headers,
-                json=data
+                data=json_dumps(data)
             )
 
             # Check if request was successful
@@ -129,7 +180,7 @@ class ChatbotClient:
 
             # Parse JSON response
             try:
-                response_data = json.loads(response_text)
+                response_data = json_loads(response_text)
                 return response_data.get('textResponse', str(response_data))
             except json.JSONDecodeError as json_err:
                 return f"Invalid JSON response. Error: {json_err}. Raw response: {response_text[:500]}"
@@ -152,10 +203,9 @@ class ChatbotClient:
             "reset": False
         }
         try:
-            chat_response = requests.post(
+            chat_response = self._session.post(
                 self.chat_url,
-                headers=self.headers,
-                json=data
+                data=json_dumps(data)
             )
 
             # Check if request was successful
@@ -173,7 +223,7 @@ class ChatbotClient:
 
             # Parse JSON response
             try:
-                response_data = json.loads(response_text)
+                response_data = json_loads(response_text)
                 return response_data.get('textResponse', str(response_data))
             except json.JSONDecodeError as json_err:
                 return f"Invalid JSON response. Error: {json_err}. Raw response: {response_text[:500]}"
@@ -183,59 +233,147 @@ class ChatbotClient:
         except Exception as e:
             return f"Chat request failed. Error: {e}"
 
-    def streaming_chat(self, message: str):
-        """
-        Generator for streaming chat responses
-        """
-        data = {
+    def _stream_request_body(self, message: str) -> bytes:
+        """Serialized request body shared by the sync and async streaming paths"""
+        return json_dumps({
             "message": message,
             "mode": "query",
             "sessionId": "scrum-meeting-session",
             "attachments": [],
             "reset": False
-        }
+        })
+
+    @staticmethod
+    def _parse_stream_line(line: str):
+        """Text carried by one SSE line, or None for lines to skip"""
+        if not line:
+            return None
+        if line.startswith("data: "):
+            line = line[len("data: "):]
+        try:
+            parsed_chunk = json_loads(line.strip())
+            return parsed_chunk.get("textResponse", "")
+        except json.JSONDecodeError:
+            return None
+        except Exception as e:
+            return f"Error processing chunk: {e}"
+
+    def streaming_chat(self, message: str):
+        """
+        Generator for streaming chat responses
+        """
+        body = self._stream_request_body(message)
 
         response_text = ""
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        try:
+            with self.stream_client.stream("POST", self.stream_chat_url, headers=self.headers, content=body) as response:
+                for line in response.iter_lines():
+                    text = self._parse_stream_line(line)
+                    if text is None:
+                        continue
+                    response_text += text
+                    yield response_text
+        except httpx.RequestError as e:
+            response_text += f"Streaming chat request failed. Error: {e}"
+            yield response_text
+        yield response_text
 
-        async def async_stream():
-            buffer = ""
-            try:
-                async with httpx.AsyncClient(timeout=self.stream_timeout) as client:
-                    async with client.stream("POST", self.stream_chat_url, headers=self.headers, json=data) as response:
-                        async for chunk in response.aiter_text():
-                            if chunk:
-                                buffer += chunk
-                                while "\n" in buffer:
-                                    line, buffer = buffer.split("\n", 1)
-                                    if line.startswith("data: "):
-                                        line = line[len("data: "):]
-                                    try:
-                                        parsed_chunk = json.loads(line.strip())
-                                        yield parsed_chunk.get("textResponse", "")
-                                    except json.JSONDecodeError:
-                                        continue
-                                    except Exception as e:
-                                        yield f"Error processing chunk: {e}"
-            except httpx.RequestError as e:
-                yield f"Streaming chat request failed. Error: {e}"
-
-        agen = async_stream()
+    def _detach_async_client(self):
+        """
+        Drop the AsyncClient from outside its event loop. The close is scheduled
+        on that loop while it still runs; once the loop is gone its sockets went
+        with it, so the stale client is simply dropped.
+        """
+        client, loop = self._async_client, self._async_loop
+        self._async_client = None
+        self._async_loop = None
+        if client is not None and loop.is_running():
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """AsyncClient bound to the running event loop, reused across calls on that loop"""
+        loop = asyncio.get_running_loop()
+        if self._async_client is not None and self._async_loop is not loop:
+            self._detach_async_client()
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                http2=HAS_H2, timeout=self.stream_timeout, limits=self._http_limits
+            )
+            self._async_loop = loop
+        return self._async_client
+
+    async def astreaming_chat(self, message: str):
+        """
+        Async generator for streaming chat responses, for callers that
+        already run an event loop. Yields the same cumulative text as
+        streaming_chat. Await aclose() before that loop ends to release
+        its connections.
+        """
+        body = self._stream_request_body(message)
+        client = self._get_async_client()
+
+        response_text = ""
         try:
-            while True:
-                chunk = loop.run_until_complete(agen.__anext__())
-                response_text += chunk
-                yield response_text
-        except StopAsyncIteration:
-            pass
-        finally:
-            loop.close()
+            async with client.stream("POST", self.stream_chat_url, headers=self.headers, content=body) as response:
+                async for line in response.aiter_lines():
+                    text = self._parse_stream_line(line)
+                    if text is None:
+                        continue
+                    response_text += text
+                    yield response_text
+        except httpx.RequestError as e:
+            response_text += f"Streaming chat request failed. Error: {e}"
+            yield response_text
         yield response_text
 
+class FramedWriter:
+    """
+    Writes newline-delimited JSON events to stdout. stream_chunk events carry
+    the cumulative text, so a pending chunk is simply replaced by the next one
+    and a background thread writes the latest max_delay after it arrived: a
+    burst of tokens costs one write, and a slow token never leaves stale text.
+    """
+    def __init__(self, max_delay: float = 0.01):
+        self.max_delay = max_delay
+        self._cond = threading.Condition()
+        self._latest = None
+        self._thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self._thread.start()
+
+    def write(self, event: dict):
+        """Write an event now, after any pending chunk it follows"""
+        with self._cond:
+            self._write_pending()
+            emit_json(event)
+
+    def write_chunk(self, event: dict):
+        """Queue a cumulative stream chunk, replacing any that is still pending"""
+        with self._cond:
+            if self._latest is None:
+                self._cond.notify()
+            self._latest = event
+
+    def flush(self):
+        with self._cond:
+            self._write_pending()
+
+    def _write_pending(self):
+        if self._latest is not None:
+            emit_json(self._latest)
+            self._latest = None
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                while self._latest is None:
+                    self._cond.wait()
+            time.sleep(self.max_delay)
+            self.flush()
+
 def main():
     """CLI interface for testing"""
     client = ChatbotClient()
+    out = FramedWriter()
 
     try:
         while True:
@@ -248,7 +386,7 @@ def main():
 
             # Parse JSON input
             try:
-                data = json.loads(line)
+                data = json_loads(line)
                 command = data.get('command')
                 message = data.get('message')
                 transcript_file = data.get('transcript_file')
@@ -259,36 +397,32 @@ def main():
 
                 if command == 'chat':
                     response = client.chat(message)
-                    print(json.dumps({"type": "response", "data": response}))
-                    sys.stdout.flush()
+                    out.write({"type": "response", "data": response})
 
                 elif command == 'chat_rag':
                     response = client.chat_with_rag(message)
-                    print(json.dumps({"type": "response", "data": response}))
-                    sys.stdout.flush()
+                    out.write({"type": "response", "data": response})
 
                 elif command == 'stream':
-                    print(json.dumps({"type": "stream_start"}))
-                    sys.stdout.flush()
+                    out.write({"type": "stream_start"})
 
                     for chunk in client.streaming_chat(message):
-                        print(json.dumps({"type": "stream_chunk", "data": chunk}))
-                        sys.stdout.flush()
+                        out.write_chunk({"type": "stream_chunk", "data": chunk})
 
-                    print(json.dumps({"type": "stream_end"}))
-                    sys.stdout.flush()
+                    out.write({"type": "stream_end"})
 
             except json.JSONDecodeError:
-                print(json.dumps({"type": "error", "data": "Invalid JSON input"}))
-                sys.stdout.flush()
+                out.write({"type": "error", "data": "Invalid JSON input"})
             except Exception as e:
-                print(json.dumps({"type": "error", "data": str(e)}))
-                sys.stdout.flush()
+                out.write({"type": "error", "data": str(e)})
 
     except KeyboardInterrupt:
         pass
     except EOFError:
         pass
+    finally:
+        out.flush()
+        client.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
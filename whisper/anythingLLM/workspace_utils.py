@@ -1,7 +1,7 @@
-import requests
-import yaml
 from pathlib import Path
 
+from _shared import SESSION, load_config
+
 def workspaces(api_key: str, base_url: str) -> dict:
     """
     Get available workspaces info
@@ -18,7 +18,7 @@ def workspaces(api_key: str, base_url: str) -> dict:
     }
 
     try:
-        workspaces_response = requests.get(workspaces_url, headers=headers)
+        workspaces_response = SESSION.get(workspaces_url, headers=headers)
 
         if workspaces_response.status_code == 200:
             return {
@@ -45,8 +45,7 @@ def get_workspaces(config_path=None):
         config_path = Path(__file__).parent / "config.yaml"
 
     try:
-        with open(config_path, "r") as file:
-            config = yaml.safe_load(file)
+        config = load_config(config_path)
 
         api_key = config["api_key"]
         base_url = config["model_server_base_url"]
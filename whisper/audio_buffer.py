@@ -0,0 +1,341 @@
+# ---------------------------------------------------------------------
+# Preallocated audio buffers shared by the live transcription scripts
+# ---------------------------------------------------------------------
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable
+
+import numpy as np
+
+
+@dataclass
+class AudioRingBuffer:
+    """
+    Fixed-size float32 ring buffer that accumulates captured audio and
+    hands out chunk_samples windows without regrowing an accumulator.
+    """
+    chunk_samples: int
+    capacity: int = 0
+    data: np.ndarray = field(init=False, repr=False)
+    write_idx: int = 0
+    read_idx: int = 0
+
+    def __post_init__(self):
+        if not self.capacity:
+            self.capacity = 2 * self.chunk_samples
+        self.data = np.empty((self.capacity,), dtype=np.float32)
+
+    def __len__(self) -> int:
+        """Number of buffered samples not yet read"""
+        return self.write_idx - self.read_idx
+
+    def write(self, samples: np.ndarray) -> int:
+        """
+        Copy as many samples as fit into the ring.
+        Returns the number of samples written so callers can drain and retry.
+        """
+        n = min(samples.shape[0], self.capacity - len(self))
+        start = self.write_idx % self.capacity
+        first = min(n, self.capacity - start)
+
+        self.data[start:start + first] = samples[:first]
+        self.data[:n - first] = samples[first:n]
+        self.write_idx += n
+        return n
+
+    def read(self, n: int, out: np.ndarray | None = None) -> np.ndarray:
+        """
+        Copy the oldest n samples out of the ring and advance past them.
+        The returned array is independent of the ring, so it is safe to hand
+        to a worker thread while capture keeps writing.
+        """
+        if out is None:
+            out = np.empty((n,), dtype=np.float32)
+
+        start = self.read_idx % self.capacity
+        first = min(n, self.capacity - start)
+
+        out[:first] = self.data[start:start + first]
+        out[first:n] = self.data[:n - first]
+        self.read_idx += n
+        return out
+
+
+class BufferPool:
+    """
+    Pool of preallocated, equally shaped numpy buffers.
+    acquire/release never block, so the pool is safe to use from the
+    sounddevice callback.
+    """
+    def __init__(self, size: int, shape: tuple, dtype=np.float32):
+        self.shape = shape
+        self.dtype = np.dtype(dtype)
+        self.misses = 0
+        self._free = deque(np.empty(shape, dtype=dtype) for _ in range(size))
+
+    def acquire(self) -> np.ndarray | None:
+        """Take a free buffer, or None when the pool is exhausted"""
+        try:
+            return self._free.pop()
+        except IndexError:
+            self.misses += 1
+            return None
+
+    def release(self, buf: np.ndarray) -> None:
+        """Return a buffer to the pool (foreign shapes are ignored)"""
+        if buf.shape == self.shape and buf.dtype == self.dtype:
+            self._free.append(buf)
+
+
+class SpscRing:
+    """
+    Single-producer/single-consumer ring of preallocated frames.
+    try_push never blocks or allocates, so it is safe to call from the
+    sounddevice callback. The data path is lock-free (each cursor has a
+    single writer); the Event is only touched to wake an idle consumer.
+    """
+    def __init__(self, n_slots: int, frame_shape: tuple, dtype=np.float32):
+        self.n_slots = n_slots
+        self.frame_shape = tuple(frame_shape)
+        self.slots = np.empty((n_slots, *self.frame_shape), dtype=dtype)
+        self.dropped = 0
+        self._head = 0  # written only by the producer
+        self._tail = 0  # written only by the consumer
+        self._ready = threading.Event()
+
+    def __len__(self) -> int:
+        return self._head - self._tail
+
+    def try_push(self, frame: np.ndarray) -> bool:
+        """Copy a frame into the next free slot; drops it if the ring is full"""
+        if self._head - self._tail >= self.n_slots or frame.shape != self.frame_shape:
+            self.dropped += 1
+            return False
+        np.copyto(self.slots[self._head % self.n_slots], frame)
+        self._head += 1
+        if not self._ready.is_set():
+            self._ready.set()
+        return True
+
+    def pop(self, timeout: float) -> np.ndarray | None:
+        """
+        Wait up to timeout for the oldest frame and return a view of its slot,
+        or None if nothing arrived. The slot stays owned by the consumer
+        until release() is called.
+        """
+        if self._head == self._tail:
+            self._ready.clear()
+            if self._head == self._tail:
+                self._ready.wait(timeout)
+            if self._head == self._tail:
+                return None
+        return self.slots[self._tail % self.n_slots]
+
+    def release(self) -> None:
+        """Hand the slot returned by the last pop() back to the producer"""
+        self._tail += 1
+
+
+def rms_gate(silence_threshold: float) -> Callable[[np.ndarray], bool]:
+    """
+    Chunk-level silence gate: a chunk is voiced when its RMS exceeds
+    silence_threshold. The sum of squares is compared against
+    threshold^2 * len(chunk), so no np.abs temporary is needed and
+    zero-padded partial chunks can be gated on their unpadded part.
+    """
+    energy = silence_threshold ** 2
+
+    def is_voiced(chunk: np.ndarray) -> bool:
+        return float(chunk @ chunk) > energy * len(chunk)
+
+    return is_voiced
+
+
+class MonoCapture:
+    """
+    sounddevice callback body shared by the float32 capture scripts.
+    Blocks are downmixed to mono and pushed into an SpscRing. A rough peak
+    gate (looser than the chunk-level silence gate) stops queueing once a
+    pause outlasts hangover_frames, so speech tails are kept but long
+    pauses are never copied. Each such pause bumps silence_breaks so the
+    consumer can flush the partial chunk instead of holding it back.
+    """
+    def __init__(self, audio_ring: SpscRing, blocksize: int, silence_threshold: float, hangover_frames: int):
+        self.audio_ring = audio_ring
+        self.blocksize = blocksize
+        self.block_silence_threshold = silence_threshold * 0.5
+        self.hangover_frames = hangover_frames
+        self.silence_run = 0
+        self.silence_breaks = 0  # written only by the callback
+        self._mono = np.empty((blocksize,), dtype=np.float32)  # downmix scratch
+
+    def push(self, indata: np.ndarray, frames: int) -> None:
+        """Gate, downmix and enqueue one captured (frames, channels) block"""
+        if max(indata.max(), -indata.min()) < self.block_silence_threshold:
+            self.silence_run += frames
+            if self.silence_run > self.hangover_frames:
+                if self.silence_run - frames <= self.hangover_frames:
+                    self.silence_breaks += 1
+                return
+        else:
+            self.silence_run = 0
+
+        if indata.shape[1] > 1 and frames == self.blocksize:
+            np.mean(indata, axis=1, out=self._mono)
+            frame = self._mono
+        else:
+            frame = indata[:, 0]
+        # a full ring means processing has fallen behind; the block is dropped
+        self.audio_ring.try_push(frame)
+
+
+class ChunkDispatcher:
+    """
+    Cuts captured audio into chunk_samples windows and submits voiced ones
+    to an executor. Chunks go out straight away while a worker is free;
+    once every worker is busy they are coalesced into batches of up to
+    max_batch. At most max_in_flight jobs are outstanding, beyond that
+    submission waits and the capture ring absorbs the backlog.
+
+    is_voiced(chunk) -> bool gates each window; job(chunks) runs on the
+    executor and must not keep the chunk buffers after it returns.
+    """
+    def __init__(
+        self,
+        executor,
+        job: Callable[[list], None],
+        is_voiced: Callable[[np.ndarray], bool],
+        chunk_samples: int,
+        max_workers: int,
+        max_batch: int,
+        max_in_flight: int | None = None,
+    ):
+        self.executor = executor
+        self.job = job
+        self.is_voiced = is_voiced
+        self.chunk_samples = chunk_samples
+        self.max_workers = max_workers
+        self.max_batch = max_batch
+        self.ring = AudioRingBuffer(chunk_samples)
+        self.pool = BufferPool(max_workers + max_batch, (chunk_samples,))
+        self._in_flight = threading.BoundedSemaphore(max_in_flight or 2 * max_workers)
+        self._futures = set()  # in-flight only; each future removes itself when done
+        self._batch = []
+        self._breaks_seen = 0
+
+    def workers_busy(self) -> bool:
+        return len(self._futures) >= self.max_workers
+
+    def submit_batch(self) -> None:
+        """Submit the pending batch as one job"""
+        batch, self._batch = self._batch, []
+        self._in_flight.acquire()
+        future = self.executor.submit(self.job, batch)
+
+        def done(f):
+            # the job owns its pooled buffers until it finishes
+            for buf in batch:
+                self.pool.release(buf)
+            self._futures.discard(f)
+            self._in_flight.release()
+
+        self._futures.add(future)
+        future.add_done_callback(done)
+
+    def poll(self) -> None:
+        """Submit a waiting batch as soon as a worker frees up"""
+        if self._batch and not self.workers_busy():
+            self.submit_batch()
+
+    def _take(self, work: np.ndarray) -> None:
+        if not self.is_voiced(work):
+            self.pool.release(work)
+            return
+        self._batch.append(work)
+        if len(self._batch) >= self.max_batch or not self.workers_busy():
+            self.submit_batch()
+
+    def feed(self, samples: np.ndarray) -> None:
+        """Append 1-D float32 samples, dispatching every full chunk"""
+        written = 0
+        while written < len(samples):
+            written += self.ring.write(samples[written:])
+
+            while len(self.ring) >= self.chunk_samples:
+                work = self.pool.acquire()
+                if work is None:
+                    work = np.empty((self.chunk_samples,), dtype=np.float32)
+                self._take(self.ring.read(self.chunk_samples, out=work))
+
+    def flush(self) -> None:
+        """Zero-pad and dispatch the pending partial chunk, if it has voice in it"""
+        n = len(self.ring)
+        if not n:
+            return
+        work = self.pool.acquire()
+        if work is None:
+            work = np.empty((self.chunk_samples,), dtype=np.float32)
+        self.ring.read(n, out=work[:n])
+        work[n:] = 0.0
+
+        if not self.is_voiced(work[:n]):
+            self.pool.release(work)
+            return
+        self._batch.append(work)
+        if len(self._batch) >= self.max_batch or not self.workers_busy():
+            self.submit_batch()
+
+    def pump(
+        self,
+        audio_ring: SpscRing,
+        timeout: float,
+        convert: Callable | None = None,
+        capture: MonoCapture | None = None,
+    ) -> None:
+        """
+        Move one captured block from audio_ring into the dispatcher.
+        When capture reports a new pause and everything queued before it has
+        been consumed, the partial chunk is flushed so an utterance shorter
+        than a chunk goes out now rather than with the next speech.
+        """
+        self.poll()
+        frame = audio_ring.pop(timeout=timeout)
+        if frame is not None:
+            try:
+                # without convert the slot is fed as a view, so it is released last
+                self.feed(convert(frame) if convert else frame.ravel())
+            finally:
+                audio_ring.release()
+
+        if capture is not None and capture.silence_breaks != self._breaks_seen and not len(audio_ring):
+            self._breaks_seen = capture.silence_breaks
+            self.flush()
+
+    def run(
+        self,
+        audio_ring: SpscRing,
+        stop_event: threading.Event,
+        timeout: float,
+        on_error: Callable[[Exception], None],
+        convert: Callable | None = None,
+        capture: MonoCapture | None = None,
+    ) -> None:
+        """
+        Dispatch captured audio until stop_event is set, then drain what was
+        already captured and flush the final partial chunk.
+        """
+        while not stop_event.is_set():
+            try:
+                self.pump(audio_ring, timeout, convert, capture)
+            except Exception as e:
+                on_error(e)
+
+        try:
+            while len(audio_ring):
+                self.pump(audio_ring, 0, convert)
+            self.flush()
+            if self._batch:
+                self.submit_batch()
+        except Exception as e:
+            on_error(e)
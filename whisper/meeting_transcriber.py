@@ -1,12 +1,12 @@
-import numpy as np
+import io
 import os
 import queue
 import sys
 import threading
 import time
-import yaml
 import requests
-import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
@@ -19,7 +19,11 @@ if str(chatbot_path) not in sys.path:
     sys.path.insert(0, str(chatbot_path))
 
 # Import existing components
-from standalone_model import StandaloneWhisperModel
+from standalone_model import get_model
+from standalone_whisper import SAMPLE_RATE
+from audio_buffer import ChunkDispatcher, MonoCapture, SpscRing, rms_gate
+from _config import load_config
+from _output import emit_json
 
 
 @dataclass
@@ -28,6 +32,7 @@ class TranscriptSegment:
     text: str
     timestamp: datetime
     confidence: float = 0.0
+    timestamp_str: str = ""  # timestamp formatted once as HH:MM:SS
 
 
 class AnythingLLMClient:
@@ -36,8 +41,7 @@ class AnythingLLMClient:
     def __init__(self, config_path: str = None):
         config_path = config_path or str(chatbot_path / "config.yaml")
 
-        with open(config_path, "r") as f:
-            config = yaml.safe_load(f)
+        config = load_config(config_path)
 
         self.api_key = config["api_key"]
         self.base_url = config["model_server_base_url"]
@@ -53,25 +57,28 @@ class AnythingLLMClient:
             "Content-Type": "application/json"
         }
 
+        # Pooled session so uploads and chat turns reuse the keep-alive connection
+        self._session = requests.Session()
+        self._session.headers.update(self.headers)
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=8,
+            max_retries=Retry(total=2, backoff_factor=0.2)
+        )
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
         print(f"Connected to AnythingLLM workspace: {self.workspace_slug}")
 
     def upload_transcript_document(self, content: str, filename: str) -> bool:
         """Upload transcript content as a document to AnythingLLM"""
         try:
-            # Create temporary file for upload
-            temp_file_path = f"temp_{filename}.txt"
-            with open(temp_file_path, 'w', encoding='utf-8') as f:
-                f.write(content)
-
-            # Upload file to AnythingLLM
+            # Upload the in-memory transcript to AnythingLLM
             upload_url = f"{self.base_url}/document/upload"
 
-            with open(temp_file_path, 'rb') as f:
-                files = {'file': (filename + '.txt', f, 'text/plain')}
-                response = requests.post(upload_url, headers=self.headers, files=files)
-
-            # Clean up temp file
-            os.remove(temp_file_path)
+            buf = io.BytesIO(content.encode('utf-8'))
+            files = {'file': (filename + '.txt', buf, 'text/plain')}
+            response = self._session.post(upload_url, files=files)
 
             if response.status_code == 200:
                 result = response.json()
@@ -97,7 +104,7 @@ class AnythingLLMClient:
                 "adds": [document_location]
             }
 
-            response = requests.post(add_url, headers=self.chat_headers, json=data)
+            response = self._session.post(add_url, headers=self.chat_headers, json=data)
 
             if response.status_code == 200:
                 print(f"[SUCCESS] Document added to workspace")
@@ -122,7 +129,7 @@ class AnythingLLMClient:
                 "attachments": []
             }
 
-            response = requests.post(chat_url, headers=self.chat_headers, json=data)
+            response = self._session.post(chat_url, headers=self.chat_headers, json=data)
 
             if response.status_code == 200:
                 return response.json().get('textResponse', 'No response received')
@@ -143,27 +150,43 @@ class MeetingTranscriber:
         self._load_whisper_config(whisper_config_path)
 
         # Initialize components
-        self.whisper_model = StandaloneWhisperModel(self.encoder_path, self.decoder_path)
+        self.whisper_model = get_model(self.encoder_path, self.decoder_path)
         self.llm_client = AnythingLLMClient(llm_config_path)
 
         # Audio processing
-        self.audio_queue = queue.Queue()
         self.stop_event = threading.Event()
+        # capture -> processing handoff; enough slots to cover two chunks of backlog
+        self.audio_ring = SpscRing(max(8, 2 * self.chunk_samples // self.blocksize), (self.blocksize,))
+        # callback side: downmix + rough peak gate, half a second of hangover
+        self._capture = MonoCapture(
+            self.audio_ring, self.blocksize, self.silence_threshold, self.sample_rate // 2
+        )
+        self._stream = None
+        self._process_thread = None
 
         # Transcript management
         self.transcript_segments: List[TranscriptSegment] = []
         self.transcript_buffer = []
         self.buffer_size = 10  # Segments to buffer before uploading
 
+        # Uploads run on their own thread so workers never wait on the network
+        self._upload_queue = queue.Queue()
+        self._upload_thread = threading.Thread(target=self._upload_worker, daemon=True)
+        self._upload_thread.start()
+
         # Live transcript file for real-time access
         self.live_transcript_file = f"../meetingnotes_{datetime.now().strftime('%Y-%m-%dT%H-%M-%S-%f')[:-3]}Z.txt"
-        self.transcript_lock = threading.Lock()
 
-        # Initialize live transcript file
-        with open(self.live_transcript_file, 'w', encoding='utf-8') as f:
-            f.write(f"Meeting Session: {self.session_id}\n")
-            f.write(f"Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-            f.write("=" * 60 + "\n\n")
+        # Initialize live transcript file; it stays open and is owned by the writer thread
+        self._live_fp = open(self.live_transcript_file, 'w', buffering=8192, encoding='utf-8')
+        self._live_fp.write(f"Meeting Session: {self.session_id}\n")
+        self._live_fp.write(f"Started: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        self._live_fp.write("=" * 60 + "\n\n")
+        self._live_fp.flush()
+
+        self._write_queue = queue.Queue()
+        self._writer_thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self._writer_thread.start()
 
         # Callbacks
         self.on_transcript_callback: Optional[Callable[[str], None]] = None
@@ -173,15 +196,21 @@ class MeetingTranscriber:
 
     def _load_whisper_config(self, config_path: str):
         """Load whisper configuration"""
-        with open(config_path, "r") as f:
-            config = yaml.safe_load(f)
+        config = load_config(config_path)
 
-        self.sample_rate = config.get("sample_rate", 16000)
+        # Whisper consumes 16 kHz mono, so capture is pinned to that rate and
+        # multi-channel input is downmixed in the callback
+        if config.get("sample_rate", SAMPLE_RATE) != SAMPLE_RATE:
+            print(f"[WARN] Ignoring sample_rate {config['sample_rate']}; capturing at {SAMPLE_RATE} Hz")
+        self.sample_rate = SAMPLE_RATE
         self.chunk_duration = config.get("chunk_duration", 4)
         self.channels = config.get("channels", 1)
+        self.blocksize = config.get("blocksize", 256)
         self.max_workers = config.get("max_workers", 4)
+        self.max_batch = config.get("max_batch", 4)
         self.silence_threshold = config.get("silence_threshold", 0.001)
         self.queue_timeout = config.get("queue_timeout", 1.0)
+        self.stop_timeout = config.get("stop_timeout", 2.0)
         self.chunk_samples = int(self.sample_rate * self.chunk_duration)
 
         self.encoder_path = config.get("encoder_path", "models/WhisperEncoder.onnx")
@@ -200,26 +229,39 @@ class MeetingTranscriber:
         """Start the meeting transcription"""
         print("[START] Starting meeting transcription...")
 
-        # Start threads
-        record_thread = threading.Thread(target=self._record_audio, daemon=True)
-        process_thread = threading.Thread(target=self._process_audio, daemon=True)
-
-        record_thread.start()
-        process_thread.start()
+        # Capture runs on PortAudio's callback thread, so only processing needs a thread
+        self._stream = self._open_audio_stream()
+        self._process_thread = threading.Thread(target=self._process_audio, daemon=True)
+        self._process_thread.start()
 
-        return record_thread, process_thread
+        return self._process_thread
 
     def stop_meeting(self):
         """Stop transcription and finalize meeting"""
         print("[STOP] Stopping meeting...")
         self.stop_event.set()
 
+        # Stop capture, then give in-flight transcriptions a bounded window to
+        # land; the app force-kills the process shortly after SIGINT, so the
+        # uploads below must not wait on a long transcription backlog
+        self._close_audio_stream()
+        if self._process_thread is not None:
+            self._process_thread.join(timeout=self.stop_timeout)
+            if self._process_thread.is_alive():
+                print(f"[WARN] Uploading before transcription finished (stop_timeout {self.stop_timeout}s)")
+
+        # Flush and close the live transcript
+        self._write_queue.put(None)
+        self._writer_thread.join(timeout=5)
+
         # Upload any remaining transcript buffer
         if self.transcript_buffer:
             self._upload_transcript_batch()
 
-        # Upload full meeting transcript
+        # Upload full meeting transcript, then wait for pending uploads to finish
         self._upload_final_transcript()
+        self._upload_queue.put(None)
+        self._upload_thread.join()
 
     def ask_question(self, question: str) -> str:
         """Ask a question about the meeting using AnythingLLM's RAG"""
@@ -238,86 +280,71 @@ class MeetingTranscriber:
         """
         return self.llm_client.chat(prompt, self.session_id)
 
-    def _record_audio(self):
-        """Record audio from microphone"""
-        import sounddevice as sd
+    def _audio_callback(self, indata, frames, time, status):
+        """Push a captured block (downmixed to mono) into the capture ring"""
+        if not self.stop_event.is_set():
+            self._capture.push(indata, frames)
 
-        def audio_callback(indata, frames, time, status):
-            if not self.stop_event.is_set():
-                self.audio_queue.put(indata.copy())
+    def _open_audio_stream(self):
+        """Open and start the microphone stream, or return None on failure"""
+        import sounddevice as sd
 
         try:
-            with sd.InputStream(
+            stream = sd.InputStream(
                 samplerate=self.sample_rate,
                 channels=self.channels,
-                callback=audio_callback
-            ):
-                print("[AUDIO] Microphone active - recording started")
-                self.stop_event.wait()
+                blocksize=self.blocksize,
+                callback=self._audio_callback
+            )
+            stream.start()
+            print("[AUDIO] Microphone active - recording started")
+            return stream
         except Exception as e:
             print(f"[ERROR] Audio recording error: {e}")
+            return None
 
-    def _process_audio(self):
-        """Process audio chunks and generate transcripts"""
-        buffer = np.empty((0,), dtype=np.float32)
-
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            while not self.stop_event.is_set():
-                try:
-                    audio_chunk = self.audio_queue.get(timeout=self.queue_timeout)
-                    audio_chunk = audio_chunk.flatten()
-                    buffer = np.concatenate([buffer, audio_chunk])
+    def _close_audio_stream(self):
+        """Stop and close the microphone stream"""
+        if self._stream is None:
+            return
 
-                    while len(buffer) >= self.chunk_samples:
-                        current_chunk = buffer[:self.chunk_samples]
-                        buffer = buffer[self.chunk_samples:]
+        try:
+            self._stream.stop()
+            self._stream.close()
+        except Exception as e:
+            print(f"[ERROR] Audio recording error: {e}")
+        self._stream = None
 
-                        executor.submit(self._transcribe_chunk, current_chunk)
+        if self.audio_ring.dropped:
+            print(f"[WARN] Dropped {self.audio_ring.dropped} audio blocks (capture ring full)")
 
-                except queue.Empty:
-                    continue
-                except Exception as e:
-                    print(f"[ERROR] Audio processing error: {e}")
+    def _process_audio(self):
+        """Cut captured audio into chunks and dispatch voiced ones for transcription"""
+        def on_error(e):
+            print(f"[ERROR] Audio processing error: {e}")
 
-    def _transcribe_chunk(self, audio_chunk: np.ndarray):
-        """Transcribe a single audio chunk"""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            dispatcher = ChunkDispatcher(
+                executor,
+                self._transcribe_batch,
+                rms_gate(self.silence_threshold),
+                self.chunk_samples,
+                self.max_workers,
+                self.max_batch,
+            )
+            dispatcher.run(
+                self.audio_ring, self.stop_event, self.queue_timeout, on_error, capture=self._capture
+            )
+
+        if dispatcher.pool.misses:
+            print(f"[WARN] Allocated {dispatcher.pool.misses} chunk buffers outside the pool (pool exhausted)")
+
+    def _transcribe_batch(self, chunks: list):
+        """Transcribe a batch of voiced audio chunks"""
         try:
-            if np.abs(audio_chunk).mean() > self.silence_threshold:
-                transcript_text = self.whisper_model.transcribe(audio_chunk, self.sample_rate)
-
+            for transcript_text in self.whisper_model.transcribe_batch(chunks, self.sample_rate):
                 if transcript_text.strip():
-                    segment = TranscriptSegment(
-                        text=transcript_text.strip(),
-                        timestamp=datetime.now()
-                    )
-
-                    # Add to segments and buffer
-                    self.transcript_segments.append(segment)
-                    self.transcript_buffer.append(segment)
-
-                    # Write to live transcript file immediately
-                    self._write_to_live_transcript(segment)
-
-                    # Output for Node.js integration
-                    timestamp_str = segment.timestamp.strftime('%H:%M:%S')
-                    transcript_data = {
-                        "timestamp": timestamp_str,
-                        "text": segment.text,
-                        "type": "transcript",
-                        "transcriptFile": os.path.abspath(self.live_transcript_file)
-                    }
-
-                    # Output JSON for Node.js
-                    print(json.dumps(transcript_data))
-                    sys.stdout.flush()
-
-                    # Call callback
-                    if self.on_transcript_callback:
-                        self.on_transcript_callback(f"[{timestamp_str}]: {segment.text}")
-
-                    # Upload batch if buffer is full
-                    if len(self.transcript_buffer) >= self.buffer_size:
-                        self._upload_transcript_batch()
+                    self._handle_transcript(transcript_text.strip())
 
         except Exception as e:
             error_data = {
@@ -325,85 +352,170 @@ class MeetingTranscriber:
                 "error": str(e),
                 "timestamp": datetime.now().strftime('%H:%M:%S')
             }
-            print(json.dumps(error_data))
-            sys.stdout.flush()
+            emit_json(error_data)
+
+    def _handle_transcript(self, text: str):
+        """Record a transcribed segment and publish it"""
+        now = datetime.now()
+        segment = TranscriptSegment(
+            text=text,
+            timestamp=now,
+            timestamp_str=now.strftime('%H:%M:%S')
+        )
+
+        # Add to segments and buffer
+        self.transcript_segments.append(segment)
+        self.transcript_buffer.append(segment)
+
+        # Write to live transcript file immediately
+        self._write_to_live_transcript(segment)
+
+        # Output for Node.js integration
+        transcript_data = {
+            "timestamp": segment.timestamp_str,
+            "text": segment.text,
+            "type": "transcript",
+            "transcriptFile": os.path.abspath(self.live_transcript_file)
+        }
+
+        # Output JSON for Node.js
+        emit_json(transcript_data)
+
+        # Call callback
+        if self.on_transcript_callback:
+            self.on_transcript_callback(f"[{segment.timestamp_str}]: {segment.text}")
+
+        # Upload batch if buffer is full
+        if len(self.transcript_buffer) >= self.buffer_size:
+            self._upload_transcript_batch()
 
     def _write_to_live_transcript(self, segment: TranscriptSegment):
-        """Write segment to live transcript file immediately"""
-        try:
-            with self.transcript_lock:
-                with open(self.live_transcript_file, 'a', encoding='utf-8') as f:
-                    timestamp_str = segment.timestamp.strftime('%H:%M:%S')
-                    f.write(f"[{timestamp_str}]: {segment.text}\n")
-                    f.flush()  # Ensure immediate write to disk
-        except Exception as e:
-            print(f"[ERROR] Live transcript write error: {e}")
+        """Queue a segment for the live transcript writer thread"""
+        self._write_queue.put(f"[{segment.timestamp_str}]: {segment.text}\n")
+
+    def _writer_loop(self, max_lines: int = 16, flush_interval: float = 0.5):
+        """
+        Append queued lines to the live transcript file.
+        Lines are written in batches and flushed every max_lines lines or
+        flush_interval seconds, so workers never wait on file I/O.
+        """
+        pending = 0
+        last_flush = time.monotonic()
+        stopping = False
+
+        while not stopping:
+            lines = []
+            try:
+                item = self._write_queue.get(timeout=flush_interval)
+                while True:
+                    if item is None:
+                        stopping = True
+                        break
+                    lines.append(item)
+                    if len(lines) >= max_lines:
+                        break
+                    item = self._write_queue.get_nowait()
+            except queue.Empty:
+                pass
+
+            try:
+                if lines:
+                    self._live_fp.writelines(lines)
+                    pending += len(lines)
+
+                now = time.monotonic()
+                if pending and (stopping or pending >= max_lines or now - last_flush >= flush_interval):
+                    self._live_fp.flush()
+                    pending = 0
+                    last_flush = now
+            except Exception as e:
+                print(f"[ERROR] Live transcript write error: {e}")
+
+        self._live_fp.close()
 
     def get_live_transcript_path(self):
         """Get the path to the live transcript file"""
         return self.live_transcript_file
 
     def _upload_transcript_batch(self):
-        """Upload current transcript buffer to AnythingLLM"""
+        """Hand the current transcript buffer to the upload worker"""
         if not self.transcript_buffer:
             return
 
+        segments, self.transcript_buffer = self.transcript_buffer, []
+        self._upload_queue.put(("batch", segments, len(self.transcript_segments)))
+
+    def _upload_final_transcript(self):
+        """Hand the complete meeting transcript to the upload worker"""
+        if not self.transcript_segments:
+            return
+
+        self._upload_queue.put(("final", list(self.transcript_segments), len(self.transcript_segments)))
+
+    def _upload_worker(self):
+        """Perform queued AnythingLLM uploads off the transcription workers"""
+        while True:
+            item = self._upload_queue.get()
+            if item is None:
+                break
+
+            kind, segments, segment_count = item
+            if kind == "batch":
+                self._send_transcript_batch(segments, segment_count)
+            else:
+                self._send_final_transcript(segments)
+
+    def _send_transcript_batch(self, segments: List[TranscriptSegment], segment_count: int):
+        """Upload a batch of transcript segments to AnythingLLM"""
         try:
             # Create batch content
-            batch_content = f"Meeting Transcript Batch - {datetime.now().strftime('%H:%M:%S')}\n"
-            batch_content += "=" * 60 + "\n\n"
-
-            for segment in self.transcript_buffer:
-                timestamp_str = segment.timestamp.strftime('%H:%M:%S')
-                batch_content += f"[{timestamp_str}]: {segment.text}\n"
+            header = (
+                f"Meeting Transcript Batch - {datetime.now().strftime('%H:%M:%S')}\n"
+                + "=" * 60 + "\n\n"
+            )
+            lines = [f"[{segment.timestamp_str}]: {segment.text}\n" for segment in segments]
+            batch_content = header + "".join(lines)
 
             # Upload to AnythingLLM
-            batch_filename = f"{self.session_id}_batch_{len(self.transcript_segments)}"
+            batch_filename = f"{self.session_id}_batch_{segment_count}"
             success = self.llm_client.upload_transcript_document(batch_content, batch_filename)
 
             if success:
-                print(f"[UPLOAD] Uploaded batch with {len(self.transcript_buffer)} segments")
-
-            # Clear buffer
-            self.transcript_buffer = []
+                print(f"[UPLOAD] Uploaded batch with {len(segments)} segments")
 
         except Exception as e:
             print(f"[ERROR] Batch upload error: {e}")
 
-    def _upload_final_transcript(self):
-        """Upload complete meeting transcript"""
-        if not self.transcript_segments:
-            return
-
+    def _send_final_transcript(self, segments: List[TranscriptSegment]):
+        """Upload the complete meeting transcript to AnythingLLM"""
         try:
             # Create full transcript
-            full_content = f"Complete Meeting Transcript - {self.session_id}\n"
-            full_content += f"Meeting Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-            full_content += f"Duration: {len(self.transcript_segments)} segments\n"
-            full_content += "=" * 80 + "\n\n"
-
-            for segment in self.transcript_segments:
-                timestamp_str = segment.timestamp.strftime('%H:%M:%S')
-                full_content += f"[{timestamp_str}]: {segment.text}\n"
+            header = (
+                f"Complete Meeting Transcript - {self.session_id}\n"
+                f"Meeting Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+                f"Duration: {len(segments)} segments\n"
+                + "=" * 80 + "\n\n"
+            )
+            lines = [f"[{segment.timestamp_str}]: {segment.text}\n" for segment in segments]
+            full_content = header + "".join(lines)
 
             # Upload final transcript
             filename = f"{self.session_id}_complete_transcript"
             success = self.llm_client.upload_transcript_document(full_content, filename)
 
             if success:
-                print(f"[UPLOAD] Final transcript uploaded with {len(self.transcript_segments)} segments")
+                print(f"[UPLOAD] Final transcript uploaded with {len(segments)} segments")
 
         except Exception as e:
             print(f"[ERROR] Final transcript upload error: {e}")
 
-
 def main():
     """Main function to run the meeting transcriber"""
     transcriber = MeetingTranscriber()
 
     try:
         # Start meeting
-        threads = transcriber.start_meeting()
+        process_thread = transcriber.start_meeting()
 
         print("\n" + "="*70)
         print("[ACTIVE] ANYTHINGLLM MEETING TRANSCRIBER ACTIVE")
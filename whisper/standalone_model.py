@@ -5,6 +5,7 @@ import numpy as np
 import onnxruntime
 import sys
 import os
+import threading
 
 # Add src directory to path for imports
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -60,16 +61,64 @@ def get_onnx_session_with_fallback(path):
         raise e
 
 
+# ONNX tensor element types we can preallocate IO-bound buffers for
+ONNX_NUMPY_TYPES = {
+    "tensor(float)": np.float32,
+    "tensor(float16)": np.float16,
+    "tensor(int32)": np.int32,
+    "tensor(int64)": np.int64,
+}
+
+
+def has_static_io(session) -> bool:
+    """True when every input/output has a fixed shape and a known dtype"""
+    return all(
+        all(isinstance(dim, int) for dim in meta.shape) and meta.type in ONNX_NUMPY_TYPES
+        for meta in [*session.get_inputs(), *session.get_outputs()]
+    )
+
+
 class StandaloneONNXEncoder:
     """Standalone ONNX encoder wrapper"""
     def __init__(self, encoder_path):
         self.session = get_onnx_session_with_fallback(encoder_path)
 
+        # The mel input is always padded to the same length, so when the exported
+        # graph has static shapes we bind preallocated input/output buffers once
+        # per thread and skip per-call tensor allocation.
+        self.input_meta = self.session.get_inputs()[0]
+        self.output_meta = self.session.get_outputs()
+        self.use_io_binding = has_static_io(self.session)
+        self._local = threading.local()
+
+    def _get_binding(self):
+        """Per-thread IO binding with its preallocated buffers"""
+        state = getattr(self._local, "state", None)
+        if state is None:
+            io = self.session.io_binding()
+            audio = np.empty(self.input_meta.shape, dtype=ONNX_NUMPY_TYPES[self.input_meta.type])
+            io.bind_ortvalue_input(self.input_meta.name, onnxruntime.OrtValue.ortvalue_from_numpy(audio))
+
+            outputs = []
+            for meta in self.output_meta:
+                buf = np.empty(meta.shape, dtype=ONNX_NUMPY_TYPES[meta.type])
+                io.bind_ortvalue_output(meta.name, onnxruntime.OrtValue.ortvalue_from_numpy(buf))
+                outputs.append(buf)
+
+            state = self._local.state = (io, audio, outputs)
+        return state
+
     def __call__(self, audio):
         try:
             # Uncomment the line below for debugging
             # print(f"🔍 Encoder input shape: {audio.shape}, dtype: {audio.dtype}")
             # sys.stdout.flush()
+            if self.use_io_binding and audio.shape == tuple(self.input_meta.shape):
+                io, bound_audio, outputs = self._get_binding()
+                np.copyto(bound_audio, audio)
+                self.session.run_with_iobinding(io)
+                # buffers are reused by this thread's next call
+                return outputs
             return self.session.run(None, {"audio": audio})
         except Exception as e:
             print(f"[ERROR] Error in encoder inference: {e}")
@@ -85,6 +134,86 @@ class StandaloneONNXDecoder:
     def __init__(self, decoder_path):
         self.session = get_onnx_session_with_fallback(decoder_path)
 
+        # The decoder runs once per token with fixed-size caches. With static
+        # shapes each thread binds its inputs/outputs once and ping-pongs the
+        # self-attention caches between two buffer pairs, so a step's output
+        # cache becomes the next step's input without any copy or allocation.
+        self.input_meta = {meta.name: meta for meta in self.session.get_inputs()}
+        self.output_meta = self.session.get_outputs()
+        self.use_io_binding = has_static_io(self.session) and len(self.output_meta) == 3
+        self._local = threading.local()
+
+    def _new_buffer(self, meta):
+        return np.empty(meta.shape, dtype=ONNX_NUMPY_TYPES[meta.type])
+
+    def _get_binding(self):
+        """Per-thread pair of IO bindings sharing token/index/logits buffers"""
+        state = getattr(self._local, "state", None)
+        if state is None:
+            x = self._new_buffer(self.input_meta["x"])
+            index = self._new_buffer(self.input_meta["index"])
+            logits = self._new_buffer(self.output_meta[0])
+            caches = [
+                (self._new_buffer(self.input_meta["k_cache_self"]),
+                 self._new_buffer(self.input_meta["v_cache_self"]))
+                for _ in range(2)
+            ]
+
+            bindings = []
+            for side in range(2):
+                io = self.session.io_binding()
+                io.bind_ortvalue_input("x", onnxruntime.OrtValue.ortvalue_from_numpy(x))
+                io.bind_ortvalue_input("index", onnxruntime.OrtValue.ortvalue_from_numpy(index))
+                k_in, v_in = caches[side]
+                k_out, v_out = caches[1 - side]
+                io.bind_ortvalue_input("k_cache_self", onnxruntime.OrtValue.ortvalue_from_numpy(k_in))
+                io.bind_ortvalue_input("v_cache_self", onnxruntime.OrtValue.ortvalue_from_numpy(v_in))
+                io.bind_ortvalue_output(self.output_meta[0].name, onnxruntime.OrtValue.ortvalue_from_numpy(logits))
+                io.bind_ortvalue_output(self.output_meta[1].name, onnxruntime.OrtValue.ortvalue_from_numpy(k_out))
+                io.bind_ortvalue_output(self.output_meta[2].name, onnxruntime.OrtValue.ortvalue_from_numpy(v_out))
+                bindings.append(io)
+
+            state = self._local.state = {
+                "bindings": bindings, "x": x, "index": index, "logits": logits,
+                "caches": caches, "cross": None,
+            }
+        return state
+
+    def _run_bound(self, x, index, k_cache_cross, v_cache_cross, k_cache_self, v_cache_self):
+        state = self._get_binding()
+        caches = state["caches"]
+
+        np.copyto(state["x"], x, casting="unsafe")
+        np.copyto(state["index"], index, casting="unsafe")
+
+        # Cross-attention caches only change once per chunk. Binding shares the
+        # caller's memory, so rebinding is skipped only while the same arrays
+        # are passed without a conversion copy.
+        cross = state["cross"]
+        if cross is None or not cross[4] or cross[0] is not k_cache_cross or cross[1] is not v_cache_cross:
+            k_cross = np.ascontiguousarray(k_cache_cross, dtype=ONNX_NUMPY_TYPES[self.input_meta["k_cache_cross"].type])
+            v_cross = np.ascontiguousarray(v_cache_cross, dtype=ONNX_NUMPY_TYPES[self.input_meta["v_cache_cross"].type])
+            for io in state["bindings"]:
+                io.bind_ortvalue_input("k_cache_cross", onnxruntime.OrtValue.ortvalue_from_numpy(k_cross))
+                io.bind_ortvalue_input("v_cache_cross", onnxruntime.OrtValue.ortvalue_from_numpy(v_cross))
+            shared = k_cross is k_cache_cross and v_cross is v_cache_cross
+            state["cross"] = (k_cache_cross, v_cache_cross, k_cross, v_cross, shared)
+
+        # Self-attention caches we returned last step are already bound as inputs
+        if k_cache_self is caches[0][0] and v_cache_self is caches[0][1]:
+            side = 0
+        elif k_cache_self is caches[1][0] and v_cache_self is caches[1][1]:
+            side = 1
+        else:
+            side = 0
+            np.copyto(caches[0][0], k_cache_self)
+            np.copyto(caches[0][1], v_cache_self)
+
+        self.session.run_with_iobinding(state["bindings"][side])
+        # buffers are reused by this thread's next call
+        k_out, v_out = caches[1 - side]
+        return [state["logits"], k_out, v_out]
+
     def __call__(self, x, index, k_cache_cross, v_cache_cross, k_cache_self, v_cache_self):
         try:
             # Convert torch tensors to numpy if needed
@@ -92,6 +221,11 @@ class StandaloneONNXDecoder:
                 index_np = index.numpy()
             else:
                 index_np = np.array(index)
+
+            if self.use_io_binding and k_cache_self.shape == tuple(self.input_meta["k_cache_self"].shape):
+                return self._run_bound(
+                    x, index_np, k_cache_cross, v_cache_cross, k_cache_self, v_cache_self
+                )
                 
             return self.session.run(
                 None,
@@ -125,18 +259,51 @@ class StandaloneWhisperModel:
         self.num_decoder_heads = 8
         self.attention_dim = 512
 
+    def make_app(self) -> StandaloneWhisperApp:
+        """Build a StandaloneWhisperApp over the loaded sessions; its errors propagate"""
+        return StandaloneWhisperApp(
+            encoder=self.encoder,
+            decoder=self.decoder,
+            num_decoder_blocks=self.num_decoder_blocks,
+            num_decoder_heads=self.num_decoder_heads,
+            attention_dim=self.attention_dim,
+        )
+
     def transcribe(self, audio: np.ndarray, sample_rate: int) -> str:
         """Transcribe audio to text"""
-        try:
-            app = StandaloneWhisperApp(
-                encoder=self.encoder,
-                decoder=self.decoder,
-                num_decoder_blocks=self.num_decoder_blocks,
-                num_decoder_heads=self.num_decoder_heads,
-                attention_dim=self.attention_dim,
-            )
-            return app.transcribe(audio, sample_rate)
-        except Exception as e:
-            print(f"[ERROR] Error during transcription: {e}")
-            sys.stdout.flush()
-            return ""
+        return self.transcribe_batch([audio], sample_rate)[0]
+
+    def transcribe_batch(self, batch: list, sample_rate: int) -> list:
+        """
+        Transcribe several audio chunks, sharing one app (and its mel filter
+        load) across the batch. The exported encoder has a fixed batch size
+        of one, so items still run through the encoder individually.
+        """
+        app = None
+        transcripts = []
+        for audio in batch:
+            try:
+                if app is None:
+                    app = self.make_app()
+                transcripts.append(app.transcribe(audio, sample_rate))
+            except Exception as e:
+                print(f"[ERROR] Error during transcription: {e}")
+                sys.stdout.flush()
+                transcripts.append("")
+        return transcripts
+
+
+# Loaded models keyed by absolute (encoder, decoder) path, so every
+# transcriber in the process shares one set of ONNX sessions
+_MODEL_CACHE: dict = {}
+_MODEL_CACHE_LOCK = threading.Lock()
+
+
+def get_model(encoder_path, decoder_path) -> StandaloneWhisperModel:
+    """Return the shared StandaloneWhisperModel for these model files, loading it once"""
+    key = (os.path.abspath(encoder_path), os.path.abspath(decoder_path))
+    with _MODEL_CACHE_LOCK:
+        model = _MODEL_CACHE.get(key)
+        if model is None:
+            model = _MODEL_CACHE[key] = StandaloneWhisperModel(*key)
+        return model
@@ -1,12 +1,8 @@
-import numpy as np
 import os
-import queue
 import sounddevice as sd
 import sys
 import threading
-import yaml
 import traceback
-import json
 import time
 
 from concurrent.futures import ThreadPoolExecutor
@@ -16,30 +12,26 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 if current_dir not in sys.path:
     sys.path.insert(0, current_dir)
 
-from standalone_model import StandaloneWhisperModel
-
-
-def flush_output():
-    """Force flush stdout and stderr for better console output in executables"""
-    sys.stdout.flush()
-    sys.stderr.flush()
+from standalone_model import StandaloneWhisperModel, get_model
+from standalone_whisper import SAMPLE_RATE
+from audio_buffer import ChunkDispatcher, MonoCapture, SpscRing, rms_gate
+from _config import load_config
+from _output import emit_json
 
 
 def process_transcription(
     whisper_model: StandaloneWhisperModel,
-    chunk: np.ndarray,
-    silence_threshold: float,
+    chunks: list,
     sample_rate: int,
     full_transcript: list
 ) -> None:
     """
-    Process a chunk of audio data and transcribe it using the Whisper model.
+    Process a batch of voiced audio chunks and transcribe them using the Whisper model.
     This function is run in a separate thread to allow for concurrent processing.
     """
 
     try:
-        if np.abs(chunk).mean() > silence_threshold:
-            transcript = whisper_model.transcribe(chunk, sample_rate)
+        for transcript in whisper_model.transcribe_batch(chunks, sample_rate):
             if transcript.strip():
                 timestamp = time.strftime('%H:%M:%S')
                 transcript_data = {
@@ -48,23 +40,23 @@ def process_transcription(
                     "type": "transcript"
                 }
                 full_transcript.append(transcript_data)
-                print(json.dumps(transcript_data))
-                flush_output()
+                emit_json(transcript_data)
     except Exception as e:
         error_data = {
             "timestamp": time.strftime('%H:%M:%S'),
             "error": str(e),
             "type": "error"
         }
-        print(json.dumps(error_data))
-        flush_output()
+        emit_json(error_data)
 
 
 def process_audio(
     whisper_model: StandaloneWhisperModel,
-    audio_queue: queue.Queue,
+    audio_ring: SpscRing,
+    capture: MonoCapture,
     stop_event: threading.Event,
     max_workers: int,
+    max_batch: int,
     queue_timeout: float,
     chunk_samples: int,
     silence_threshold: float,
@@ -72,78 +64,62 @@ def process_audio(
     full_transcript: list
 ) -> None:
     """
-    Process audio data from the queue and transcribe it using the Whisper model.
+    Process audio data from the capture ring and transcribe it using the Whisper model.
+    Blocks are cut into chunks and dispatched by a ChunkDispatcher.
     """
 
-    buffer = np.empty((0,), dtype=np.float32)
+    def on_error(e):
+        error_data = {
+            "timestamp": time.strftime('%H:%M:%S'),
+            "error": f"Error in audio processing: {e}",
+            "type": "error"
+        }
+        emit_json(error_data)
 
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = []
-
-        while not stop_event.is_set():
-            try:
-                audio_chunk = audio_queue.get(timeout=queue_timeout)
-                audio_chunk = audio_chunk.flatten()
-                buffer = np.concatenate([buffer, audio_chunk])
-
-                while len(buffer) >= chunk_samples:
-                    current_chunk = buffer[:chunk_samples]
-                    buffer = buffer[chunk_samples:]
-
-                    future = executor.submit(
-                        process_transcription,
-                        whisper_model,
-                        current_chunk,
-                        silence_threshold,
-                        sample_rate,
-                        full_transcript
-                    )
-                    futures = [f for f in futures if not f.done()] + [future]
-
-            except queue.Empty:
-                continue
-            except Exception as e:
-                error_data = {
-                    "timestamp": time.strftime('%H:%M:%S'),
-                    "error": f"Error in audio processing: {e}",
-                    "type": "error"
-                }
-                print(json.dumps(error_data))
-                flush_output()
-
-        # Wait for transcription futures to complete
-        for future in futures:
-            try:
-                future.result()
-            except Exception as e:
-                error_data = {
-                    "timestamp": time.strftime('%H:%M:%S'),
-                    "error": f"Error in future result: {e}",
-                    "type": "error"
-                }
-                print(json.dumps(error_data))
-                flush_output()
+        dispatcher = ChunkDispatcher(
+            executor,
+            lambda chunks: process_transcription(whisper_model, chunks, sample_rate, full_transcript),
+            rms_gate(silence_threshold),
+            chunk_samples,
+            max_workers,
+            max_batch,
+        )
+        dispatcher.run(audio_ring, stop_event, queue_timeout, on_error, capture=capture)
+        # leaving the executor waits for in-flight transcriptions to finish
+
+    if dispatcher.pool.misses:
+        status_data = {
+            "timestamp": time.strftime('%H:%M:%S'),
+            "message": f"Allocated {dispatcher.pool.misses} chunk buffers outside the pool (pool exhausted)",
+            "type": "status"
+        }
+        emit_json(status_data)
 
 
 def record_audio(
-    audio_queue: queue.Queue,
+    capture: MonoCapture,
     stop_event: threading.Event,
     sample_rate: int,
-    channels: int
+    channels: int,
+    blocksize: int
 ) -> None:
     """
-    Record audio from the microphone and put it into the audio queue.
+    Record audio from the microphone and push it into the capture ring.
     """
 
+    audio_ring = capture.audio_ring
+
     def audio_callback(indata, frames, time, status):
         """Callback function for audio input stream."""
         if not stop_event.is_set():
-            audio_queue.put(indata.copy())
+            capture.push(indata, frames)
 
     try:
         with sd.InputStream(
             samplerate=sample_rate,
             channels=channels,
+            blocksize=blocksize,
             callback=audio_callback
         ):
             status_data = {
@@ -151,17 +127,23 @@ def record_audio(
                 "message": "Microphone stream initialized",
                 "type": "status"
             }
-            print(json.dumps(status_data))
-            flush_output()
+            emit_json(status_data)
             stop_event.wait()
+
+        if audio_ring.dropped:
+            status_data = {
+                "timestamp": time.strftime('%H:%M:%S'),
+                "message": f"Dropped {audio_ring.dropped} audio blocks (capture ring full)",
+                "type": "status"
+            }
+            emit_json(status_data)
     except Exception as e:
         error_data = {
             "timestamp": time.strftime('%H:%M:%S'),
             "error": f"Error in audio recording: {e}",
             "type": "error"
         }
-        print(json.dumps(error_data))
-        flush_output()
+        emit_json(error_data)
 
 
 class NodeJSWhisperTranscriber:
@@ -173,29 +155,36 @@ class NodeJSWhisperTranscriber:
             "message": "Starting Whisper Transcription for Node.js",
             "type": "status"
         }
-        print(json.dumps(status_data))
-        flush_output()
+        emit_json(status_data)
 
         try:
             config_path = os.path.join(current_dir, "config.yaml")
-            with open(config_path, "r") as f:
-                config = yaml.safe_load(f)
+            config = load_config(config_path)
 
             status_data = {
                 "timestamp": time.strftime('%H:%M:%S'),
                 "message": "Configuration loaded successfully",
                 "type": "status"
             }
-            print(json.dumps(status_data))
-            flush_output()
+            emit_json(status_data)
 
-            # audio settings
-            self.sample_rate = config.get("sample_rate", 16000)
+            # audio settings - Whisper consumes 16 kHz mono, so capture is pinned
+            # to that rate and multi-channel input is downmixed in the callback
+            if config.get("sample_rate", SAMPLE_RATE) != SAMPLE_RATE:
+                status_data = {
+                    "timestamp": time.strftime('%H:%M:%S'),
+                    "message": f"Ignoring sample_rate {config['sample_rate']}; capturing at {SAMPLE_RATE} Hz",
+                    "type": "status"
+                }
+                emit_json(status_data)
+            self.sample_rate = SAMPLE_RATE
             self.chunk_duration = config.get("chunk_duration", 4)
             self.channels = config.get("channels", 1)
+            self.blocksize = config.get("blocksize", 256)
 
             # processing settings
             self.max_workers = config.get("max_workers", 4)
+            self.max_batch = config.get("max_batch", 4)
             self.silence_threshold = config.get("silence_threshold", 0.001)
             self.queue_timeout = config.get("queue_timeout", 1.0)
             self.chunk_samples = int(self.sample_rate * self.chunk_duration)
@@ -215,8 +204,7 @@ class NodeJSWhisperTranscriber:
                     "error": f"Encoder model not found at {self.encoder_path}",
                     "type": "error"
                 }
-                print(json.dumps(error_data))
-                flush_output()
+                emit_json(error_data)
                 sys.exit(1)
 
             if not os.path.exists(self.decoder_path):
@@ -225,8 +213,7 @@ class NodeJSWhisperTranscriber:
                     "error": f"Decoder model not found at {self.decoder_path}",
                     "type": "error"
                 }
-                print(json.dumps(error_data))
-                flush_output()
+                emit_json(error_data)
                 sys.exit(1)
 
             status_data = {
@@ -234,8 +221,7 @@ class NodeJSWhisperTranscriber:
                 "message": "Model files found",
                 "type": "status"
             }
-            print(json.dumps(status_data))
-            flush_output()
+            emit_json(status_data)
 
             # initialize the model
             status_data = {
@@ -243,21 +229,26 @@ class NodeJSWhisperTranscriber:
                 "message": "Loading Whisper model...",
                 "type": "status"
             }
-            print(json.dumps(status_data))
-            flush_output()
+            emit_json(status_data)
 
-            self.model = StandaloneWhisperModel(self.encoder_path, self.decoder_path)
+            self.model = get_model(self.encoder_path, self.decoder_path)
 
             status_data = {
                 "timestamp": time.strftime('%H:%M:%S'),
                 "message": "Model loaded successfully!",
                 "type": "status"
             }
-            print(json.dumps(status_data))
-            flush_output()
+            emit_json(status_data)
 
-            # initialize the audio queue and stop event
-            self.audio_queue = queue.Queue()
+            # initialize the capture ring and stop event; enough slots to cover
+            # two chunks of backlog
+            self.audio_ring = SpscRing(
+                max(8, 2 * self.chunk_samples // self.blocksize), (self.blocksize,)
+            )
+            # callback side: downmix + rough peak gate, half a second of hangover
+            self.capture = MonoCapture(
+                self.audio_ring, self.blocksize, self.silence_threshold, self.sample_rate // 2
+            )
             self.stop_event = threading.Event()
 
         except Exception as e:
@@ -266,8 +257,7 @@ class NodeJSWhisperTranscriber:
                 "error": f"Error during initialization: {e}",
                 "type": "error"
             }
-            print(json.dumps(error_data))
-            flush_output()
+            emit_json(error_data)
             sys.exit(1)
 
     def run(self):
@@ -279,9 +269,11 @@ class NodeJSWhisperTranscriber:
                 target=process_audio,
                 args=(
                     self.model,
-                    self.audio_queue,
+                    self.audio_ring,
+                    self.capture,
                     self.stop_event,
                     self.max_workers,
+                    self.max_batch,
                     self.queue_timeout,
                     self.chunk_samples,
                     self.silence_threshold,
@@ -294,10 +286,11 @@ class NodeJSWhisperTranscriber:
             record_thread = threading.Thread(
                 target=record_audio,
                 args=(
-                    self.audio_queue,
+                    self.capture,
                     self.stop_event,
                     self.sample_rate,
-                    self.channels
+                    self.channels,
+                    self.blocksize
                 )
             )
             record_thread.start()
@@ -314,8 +307,7 @@ class NodeJSWhisperTranscriber:
                     "message": "Stopping transcription...",
                     "type": "status"
                 }
-                print(json.dumps(status_data))
-                flush_output()
+                emit_json(status_data)
             finally:
                 self.stop_event.set()
                 record_thread.join()
@@ -327,16 +319,15 @@ class NodeJSWhisperTranscriber:
                 "error": f"Error during execution: {e}",
                 "type": "error"
             }
-            print(json.dumps(error_data))
-            flush_output()
+            emit_json(error_data)
 
     def get_full_transcript(self):
         """Return the full transcript as formatted text."""
-        transcript_text = ""
-        for entry in self.full_transcript:
-            if entry["type"] == "transcript":
-                transcript_text += f"[{entry['timestamp']}] {entry['text']}\n"
-        return transcript_text
+        return "".join(
+            f"[{entry['timestamp']}] {entry['text']}\n"
+            for entry in self.full_transcript
+            if entry["type"] == "transcript"
+        )
 
     def stop_transcription(self):
         """Stop the transcription process."""